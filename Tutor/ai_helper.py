@@ -1,5 +1,7 @@
 """Helper module for AI-powered study guide generation."""
 import os
+from functools import lru_cache
+import httpx
 from flask import Blueprint
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -10,12 +12,17 @@ ai_helper_blueprint = Blueprint("ai_helper", __name__)
 
 DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY", "sk-2baac3856127425998a967f88ff10c59")
 
+@lru_cache(maxsize=1)
 def get_openai_client():
-    """Creates OpenAI client with Deepseek params"""
-    return OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com")
+    """Creates OpenAI client with Deepseek params, shared across requests"""
+    # Keep idle connections to DeepSeek open so requests reuse the TLS session
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60)
+    )
+    return OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com", http_client=http_client)
 
-def generate_study_guide(data):
-    """Generate a study guide using the DeepSeek API."""
+def build_messages(data):
+    """Build the chat messages for a study guide request."""
     class_name = data.get('class', 'General')
     unit = data.get('unit', 'Unknown')
     year = data.get('year', 'College')
@@ -45,14 +52,21 @@ def generate_study_guide(data):
         f"Please generate a comprehensive study guide to help me prepare for my exam or assignment."
     )
 
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+def generate_study_guide(data):
+    """Generate a study guide using the DeepSeek API."""
+    class_name = data.get('class', 'General')
+    unit = data.get('unit', 'Unknown')
+
     try:
         client = get_openai_client()
         response = client.chat.completions.create(
             model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=build_messages(data),
             temperature=0.7,
             max_tokens=4000,
             stream=False
@@ -61,11 +75,7 @@ def generate_study_guide(data):
         content = response.choices[0].message.content
 
         if not content.strip().startswith("====="):
-            formatted_content = f"""
-            ===== STUDY GUIDE FOR {class_name.upper()} - {unit.upper()} =====
-
-            {content}
-            """
+            formatted_content = f"===== STUDY GUIDE FOR {class_name.upper()} - {unit.upper()} =====\n\n{content}\n"
         else:
             formatted_content = content
 
@@ -75,3 +85,44 @@ def generate_study_guide(data):
         error_msg = f"Error generating study guide: {str(error)}"
         print(error_msg)  # For debugging
         return None, error_msg
+
+def stream_study_guide(data):
+    """Stream a study guide from the DeepSeek API as it is generated.
+
+    Yields text chunks. The section-header fallback of generate_study_guide
+    is applied once the start of the reply is known.
+    """
+    class_name = data.get('class', 'General')
+    unit = data.get('unit', 'Unknown')
+
+    client = get_openai_client()
+    response = client.chat.completions.create(
+        model="deepseek-chat",
+        messages=build_messages(data),
+        temperature=0.7,
+        max_tokens=4000,
+        stream=True
+    )
+
+    header = f"===== STUDY GUIDE FOR {class_name.upper()} - {unit.upper()} =====\n\n"
+    head = ""
+    for chunk in response:
+        text = chunk.choices[0].delta.content or ""
+        if head is None:
+            if text:
+                yield text
+            continue
+
+        # Hold back the start of the reply until we know whether it opens
+        # with a section header
+        head += text
+        if len(head.lstrip()) < len("====="):
+            continue
+        if not head.lstrip().startswith("====="):
+            yield header
+        yield head
+        head = None
+
+    if head and head.strip():
+        yield header
+        yield head
@@ -1,10 +1,55 @@
 """App entry point"""
 import os
+import orjson
 from flask import Flask, render_template
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 from study_guide import study_guide_bp
 from main import main_bp
 
+class OrJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for request parsing and jsonify.
+
+    Serializes the same types as Flask's default provider: dates as HTTP
+    dates, and Decimal, UUID and ``__html__`` objects through ``default``.
+    Non-ASCII text is written as UTF-8 rather than escaped. Arguments orjson
+    has no option for are handled by the default provider.
+    """
+
+    def dumps(self, obj, **kwargs):
+        unsupported = set(kwargs) - {'default', 'sort_keys', 'indent', 'separators'}
+        if unsupported or kwargs.get('indent') not in (None, 2) \
+                or kwargs.get('separators') not in (None, (',', ':')):
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrJSONProvider(app)
+app.config['COMPRESS_MIMETYPES'] = [
+    'application/json',
+    'text/plain',
+    'text/html',
+    'text/css',
+    'application/javascript',
+    'text/javascript',
+]
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+Compress(app)
 
 app.register_blueprint(main_bp)
 app.register_blueprint(study_guide_bp)
@@ -0,0 +1,12 @@
+"""Gunicorn settings for the web process"""
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Study guide requests spend most of their time waiting on the DeepSeek API,
+# so each worker serves several of them on threads
+workers = int(os.environ.get('WEB_CONCURRENCY', max(2, multiprocessing.cpu_count())))
+worker_class = "gthread"
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+keepalive = 30
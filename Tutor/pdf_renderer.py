@@ -0,0 +1,139 @@
+"""PDF rendering for study guides.
+
+Kept free of Flask and the DeepSeek client so render worker processes only
+import ReportLab.
+"""
+import io
+import re
+import textwrap
+from datetime import date
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.units import inch
+
+# PDF styles, built once and shared by every render
+_styles = getSampleStyleSheet()
+
+PRIMARY_COLOR = colors.HexColor('#0077ff')
+MUTED_COLOR = colors.HexColor('#505050')
+
+TITLE_STYLE = ParagraphStyle(
+    name='CustomTitle',
+    parent=_styles['Heading1'],
+    fontSize=18,
+    alignment=TA_CENTER,
+    spaceAfter=20,
+    textColor=PRIMARY_COLOR
+)
+
+SUBTITLE_STYLE = ParagraphStyle(
+    name='CustomSubtitle',
+    parent=_styles['Heading2'],
+    fontSize=14,
+    alignment=TA_CENTER,
+    spaceAfter=10,
+    textColor=MUTED_COLOR
+)
+
+HEADING_STYLE = ParagraphStyle(
+    name='CustomHeading',
+    parent=_styles['Heading2'],
+    fontSize=14,
+    spaceAfter=8,
+    spaceBefore=16,
+    textColor=PRIMARY_COLOR
+)
+
+BODY_STYLE = ParagraphStyle(
+    name='CustomBodyText',
+    parent=_styles['BodyText'],
+    fontSize=11,
+    spaceBefore=6,
+    spaceAfter=6
+)
+
+BULLET_PREFIX = '&nbsp;&nbsp;&nbsp;&nbsp;• '
+SUB_BULLET_PREFIX = '&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;◦ '
+
+# Sub-points use the prompt's '   - ' form; any other '- ' line is a bullet point
+_SUB_BULLET_RE = re.compile(r'^   - ', re.M)
+_BULLET_RE = re.compile(r'^[ \t]*- ', re.M)
+
+def format_section_content(section_content):
+    """Format bullet points in a section and return its non-empty lines."""
+    formatted = _SUB_BULLET_RE.sub(SUB_BULLET_PREFIX, textwrap.dedent(section_content))
+    formatted = _BULLET_RE.sub(BULLET_PREFIX, formatted)
+    return [line.strip() for line in formatted.splitlines() if line.strip()]
+
+# A '===== TITLE =====' header and the body that follows it, up to the next header
+_SECTION_RE = re.compile(r'=====[ \t]*([^\n]*?)[ \t]*=====(.*?)(?======|\Z)', re.S)
+
+def iter_sections(text_content):
+    """Yield (title, content) pairs for each section of a study guide.
+
+    Text outside any section header is yielded with a title of None.
+    """
+    position = 0
+    for match in _SECTION_RE.finditer(text_content):
+        if text_content[position:match.start()].strip():
+            yield None, text_content[position:match.start()]
+        yield match.group(1), match.group(2)
+        position = match.end()
+    if text_content[position:].strip():
+        yield None, text_content[position:]
+
+FOOTER_TEXT = "This study guide was automatically generated by TutorAI to help with your studies."
+
+def generate_pdf(text_content, output_path, title="Study Guide", education_level="College"):
+    """Generate a PDF from the text content.
+
+    output_path may be a file path or a writable binary file object.
+    """
+
+    # Create the PDF document using ReportLab
+    doc = SimpleDocTemplate(
+        output_path,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72
+    )
+
+    # Prepare the elements that will go into the PDF
+    elements = []
+
+    # Add title and subtitle
+    title_text = f"STUDY GUIDE: {title.upper()}"
+    elements.append(Paragraph(title_text, TITLE_STYLE))
+
+    date_text = f"Education Level: {education_level} | Generated on: {date.today().isoformat()}"
+    elements.append(Paragraph(date_text, SUBTITLE_STYLE))
+    elements.append(Spacer(1, 0.2 * inch))
+
+    # Collect (text, style) pairs for the sections, then build their paragraphs in one pass
+    entries = []
+    for section_title, section_content in iter_sections(text_content):
+        if section_title:
+            entries.append((section_title, HEADING_STYLE))
+        entries.extend((line, BODY_STYLE) for line in format_section_content(section_content))
+
+    elements.extend(Paragraph(text, style) for text, style in entries)
+
+    # Add footer note
+    elements.append(Spacer(1, 0.5 * inch))
+    elements.append(Paragraph(FOOTER_TEXT, SUBTITLE_STYLE))
+
+    # Build the PDF
+    doc.build(elements)
+
+    return output_path
+
+def render_pdf(text_content, title="Study Guide", education_level="College"):
+    """Render a study guide PDF and return its bytes."""
+    buffer = io.BytesIO()
+    generate_pdf(text_content, buffer, title=title, education_level=education_level)
+    return buffer.getvalue()
@@ -26,8 +26,8 @@ document.addEventListener('DOMContentLoaded', function() {
             details: document.getElementById('details').value
         };
         
-        // Send form data to backend
-        fetch('/generate-study-guide', {
+        // Stream the study guide from the backend so text appears as it is generated
+        fetch('/stream-study-guide', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -35,36 +35,34 @@ document.addEventListener('DOMContentLoaded', function() {
             body: JSON.stringify(formData)
         })
         .then(response => {
-            return response.json().then(data => {
-                if (!response.ok) {
+            if (!response.ok) {
+                return response.json().then(data => {
                     throw new Error(data.error || 'Network response was not ok');
-                }
-                return data;
-            });
-        })
-        .then(data => {
-            if (!data.success) {
-                throw new Error(data.error || 'Failed to generate study guide');
+                });
             }
             
-            // Hide loading, show content
-            loadingElement.style.display = 'none';
-            studyGuideContent.style.display = 'block';
-            downloadBtn.style.display = 'block';
-            
-            // Display the generated study guide
-            studyGuideContent.textContent = data.content;
-            
+            studyGuideContent.textContent = '';
+            return readStudyGuideStream(response, text => {
+                // Hide loading and show content once the first text arrives
+                loadingElement.style.display = 'none';
+                studyGuideContent.style.display = 'block';
+                studyGuideContent.textContent += text;
+            });
+        })
+        .then(filename => {
             // Store the filename for download
-            currentFilename = data.filename;
+            currentFilename = filename;
+            downloadBtn.style.display = 'block';
             
             // Add futuristic typing effect
-            applyTypingEffect(studyGuideContent, data.content);
+            applyTypingEffect(studyGuideContent, studyGuideContent.textContent);
         })
         .catch(error => {
             console.error('Error generating study guide:', error);
             
             // Update loading message to show error
+            loadingElement.style.display = 'flex';
+            studyGuideContent.style.display = 'none';
             loadingElement.querySelector('.spinner').style.borderTopColor = '#ff3366';
             loadingElement.querySelector('p').textContent = `Error: ${error.message || 'Unknown error occurred'}`;
             
@@ -88,6 +86,57 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
+    // Read server-sent events from the study guide stream, passing text to onText.
+    // Resolves with the PDF filename from the final 'done' event.
+    function readStudyGuideStream(response, onText) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        function handleEvent(rawEvent) {
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) {
+                    eventName = line.slice('event: '.length);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice('data: '.length);
+                }
+            });
+            
+            const payload = JSON.parse(data);
+            if (eventName === 'error') {
+                throw new Error(payload);
+            }
+            if (eventName === 'done') {
+                return payload.filename;
+            }
+            onText(payload);
+            return null;
+        }
+        
+        function pump() {
+            return reader.read().then(({ done, value }) => {
+                buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                
+                for (const rawEvent of events) {
+                    const filename = handleEvent(rawEvent);
+                    if (filename) {
+                        return filename;
+                    }
+                }
+                if (done) {
+                    throw new Error('Study guide stream ended unexpectedly');
+                }
+                return pump();
+            });
+        }
+        
+        return pump();
+    }
+    
     // Download button handler
     downloadBtn.addEventListener('click', function() {
         if (currentFilename) {
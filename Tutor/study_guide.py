@@ -1,23 +1,178 @@
 """Study guide functions"""
 import os
+import json
+import time
+import hashlib
+import secrets
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file
-from ai_helper import generate_study_guide
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
-from reportlab.lib.units import inch
+from flask import Blueprint, Response, request, jsonify, send_from_directory, stream_with_context
+from werkzeug.exceptions import NotFound
+from ai_helper import generate_study_guide, stream_study_guide
+from pdf_renderer import render_pdf
 
 study_guide_bp = Blueprint('study_guide', __name__)
 
+GUIDES_DIR = os.path.abspath("static/guides")
+DOWNLOAD_MAX_AGE = 31536000
+
+# ReportLab rendering is CPU-bound, so it runs in worker processes instead of
+# holding a request thread and the GIL
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 2))
+PDF_RENDER_TIMEOUT = int(os.environ.get('PDF_RENDER_TIMEOUT', 60))
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pdf_pool
+
+def _discard_pdf_pool(pool):
+    """Replace a pool that lost a worker or has one stuck on a render."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    # shutdown() does not stop running workers, so terminate them directly.
+    # _processes is a CPython internal of ProcessPoolExecutor; once its workers
+    # are gone the executor fails every pending render with BrokenProcessPool.
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False)
+
+def _submit_render(args):
+    pool = _get_pdf_pool()
+    try:
+        return pool, pool.submit(render_pdf, *args)
+    except RuntimeError:
+        # The pool broke or was discarded by another thread after we got it
+        _discard_pdf_pool(pool)
+        pool = _get_pdf_pool()
+        return pool, pool.submit(render_pdf, *args)
+
+def _render(args):
+    pool, future = _submit_render(args)
+    try:
+        return future.result(timeout=PDF_RENDER_TIMEOUT)
+    except FutureTimeoutError:
+        _discard_pdf_pool(pool)
+        raise
+    except BrokenProcessPool:
+        _discard_pdf_pool(pool)
+        raise
+
+def render_pdf_in_pool(text_content, title, education_level):
+    """Render a study guide PDF in a worker process and return its bytes."""
+    args = (text_content, title, education_level)
+    try:
+        return _render(args)
+    except BrokenProcessPool:
+        # A worker died, e.g. OOM killed, or another render timed out and took
+        # the pool down; retry once on a fresh pool
+        return _render(args)
+
+def save_pdf(filename, pdf_bytes):
+    """Store a rendered PDF for download.
+
+    Writing it to GUIDES_DIR lets any gunicorn worker on the same dyno serve
+    the download, not just the one that rendered it.
+    """
+    os.makedirs(GUIDES_DIR, exist_ok=True)
+    tmp_path = f"{GUIDES_DIR}/.{filename}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, f"{GUIDES_DIR}/{filename}")
+
+# Generated guides are reused for identical requests for up to an hour
+GUIDE_CACHE_SIZE = 512
+GUIDE_CACHE_TTL = 3600
+_guide_cache = OrderedDict()
+_guide_cache_lock = threading.Lock()
+
+def guide_cache_key(data, use_mock):
+    """Hash the fields that determine a generated study guide."""
+    fields = [use_mock] + [data.get(k) for k in ('class', 'unit', 'year', 'details')]
+    return hashlib.blake2b(json.dumps(fields).encode(), digest_size=16).hexdigest()
+
+def cache_guide(key, study_guide, pdf_filename):
+    """Remember a generated study guide and the download name of its PDF."""
+    with _guide_cache_lock:
+        _guide_cache[key] = (time.monotonic() + GUIDE_CACHE_TTL, study_guide, pdf_filename)
+        _guide_cache.move_to_end(key)
+        while len(_guide_cache) > GUIDE_CACHE_SIZE:
+            _guide_cache.popitem(last=False)
+
+def get_cached_guide(key):
+    """Return (study_guide, pdf_filename) for a key, or None if missing or expired."""
+    with _guide_cache_lock:
+        entry = _guide_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _guide_cache[key]
+            return None
+        return entry[1], entry[2]
+
+MAX_FIELD_LENGTH = 4096
+
+def validate_study_guide_request(data):
+    """Return an error message if the request payload is unusable, else None."""
+    if not isinstance(data, dict):
+        return "Request body must be a JSON object"
+    for field in ('class', 'unit', 'year', 'details'):
+        value = data.get(field, '')
+        if not isinstance(value, str):
+            return f"'{field}' must be a string"
+        if len(value) > MAX_FIELD_LENGTH:
+            return f"'{field}' must be at most {MAX_FIELD_LENGTH} characters"
+    return None
+
+def publish_study_guide(data, study_guide, cache_key):
+    """Render and store the PDF for a generated guide and return its download name."""
+    class_name = data.get('class', 'General')
+    unit = data.get('unit', 'Unknown')
+    year = data.get('year', 'College')
+
+    pdf_bytes = render_pdf_in_pool(study_guide, f"{class_name} - {unit}", year)
+    # Random names so concurrent requests never share a download
+    pdf_filename = f"study_guide_{secrets.token_urlsafe(8)}.pdf"
+    save_pdf(pdf_filename, pdf_bytes)
+    cache_guide(cache_key, study_guide, pdf_filename)
+    return pdf_filename
+
+def study_guide_response(pdf_filename, study_guide):
+    """Build the success response, including the guide text only when asked for."""
+    result = {"success": True, "filename": pdf_filename}
+    if request.args.get('include_content', 'false').lower() == 'true':
+        result["content"] = study_guide
+    return jsonify(result)
+
 @study_guide_bp.route('/generate-study-guide', methods=['POST'])
 def handle_generate_study_guide():
     """Generate study guide endpoint"""
-    data = request.json
+    data = request.get_json(silent=True)
+    invalid = validate_study_guide_request(data)
+    if invalid:
+        return jsonify({"success": False, "error": invalid}), 400
+
     try:
         use_mock = os.environ.get('USE_MOCK_API', 'False').lower() == 'true'
+        cache_key = guide_cache_key(data, use_mock)
+        cached = get_cached_guide(cache_key)
+        if cached is not None:
+            study_guide, pdf_filename = cached
+            return study_guide_response(pdf_filename, study_guide)
+
         if use_mock:
             study_guide = mock_deekseek_api(data)
             success = True
@@ -29,145 +184,69 @@ def handle_generate_study_guide():
         if not success or not study_guide:
             return jsonify({"success": False, "error": error or "Failed to generate study guide"}), 500
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        txt_filename = f"study_guide_{timestamp}.txt"
-        pdf_filename = f"study_guide_{timestamp}.pdf"
-
-        with open(os.path.join("static/guides", txt_filename), "w") as f:
-            f.write(study_guide)
-
-        class_name = data.get('class', 'General')
-        unit = data.get('unit', 'Unknown')
-        year = data.get('year', 'College')
-
-        generate_pdf(
-            study_guide,
-            os.path.join("static/guides", pdf_filename),
-            title=f"{class_name} - {unit}",
-            education_level=year
-        )
-
-        return jsonify({"success": True, "filename": pdf_filename, "content": study_guide})
+        pdf_filename = publish_study_guide(data, study_guide, cache_key)
+        return study_guide_response(pdf_filename, study_guide)
 
     except Exception as e:
         return jsonify({"success": False, "error": f"An unexpected error occurred: {str(e)}"}), 500
 
+@study_guide_bp.route('/stream-study-guide', methods=['POST'])
+def handle_stream_study_guide():
+    """Stream study guide text as server-sent events while it is generated.
+
+    The final 'done' event carries the filename of the rendered PDF.
+    """
+    data = request.get_json(silent=True)
+    invalid = validate_study_guide_request(data)
+    if invalid:
+        return jsonify({"success": False, "error": invalid}), 400
+
+    use_mock = os.environ.get('USE_MOCK_API', 'False').lower() == 'true'
+    cache_key = guide_cache_key(data, use_mock)
+
+    def events():
+        try:
+            cached = get_cached_guide(cache_key)
+            if cached is not None:
+                study_guide, pdf_filename = cached
+                yield f"data: {json.dumps(study_guide)}\n\n"
+            else:
+                parts = []
+                chunks = [mock_deekseek_api(data)] if use_mock else stream_study_guide(data)
+                for chunk in chunks:
+                    parts.append(chunk)
+                    yield f"data: {json.dumps(chunk)}\n\n"
+
+                study_guide = "".join(parts)
+                if not study_guide.strip():
+                    raise ValueError("Failed to generate study guide")
+                # The PDF is rendered once the full text has been sent
+                pdf_filename = publish_study_guide(data, study_guide, cache_key)
+        except Exception as e:
+            error = json.dumps(f"Error generating study guide: {str(e)}")
+            yield f"event: error\ndata: {error}\n\n"
+            return
+        done = json.dumps({"filename": pdf_filename})
+        yield f"event: done\ndata: {done}\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream')
+
 @study_guide_bp.route('/download/<filename>')
 def download(filename):
     """Download endpoint"""
-    file_path = os.path.join("static/guides", filename)
-    if not os.path.exists(file_path) or ".." in filename:
+    if ".." in filename or "/" in filename:
         return "File not found", 404
-    mime_type = "application/pdf" if filename.endswith(".pdf") else "text/plain"
-    return send_file(file_path, mimetype=mime_type, as_attachment=True, download_name=filename)
-
-
-def generate_pdf(text_content, output_path, title="Study Guide", education_level="College"):
-    """Generate a PDF from the text content."""
-
-    # Create the PDF document using ReportLab
-    doc = SimpleDocTemplate(
-        output_path,
-        pagesize=letter,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=72
-    )
-
-    # Define styles
-    styles = getSampleStyleSheet()
-
-    # Create custom styles without overwriting existing ones
-    custom_title_style = ParagraphStyle(
-        name='CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        alignment=TA_CENTER,
-        spaceAfter=20,
-        textColor=colors.HexColor('#0077ff')
-    )
-
-    custom_subtitle_style = ParagraphStyle(
-        name='CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=14,
-        alignment=TA_CENTER,
-        spaceAfter=10,
-        textColor=colors.HexColor('#505050')
-    )
-
-    custom_heading_style = ParagraphStyle(
-        name='CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=8,
-        spaceBefore=16,
-        textColor=colors.HexColor('#0077ff')
-    )
-
-    custom_body_style = ParagraphStyle(
-        name='CustomBodyText',
-        parent=styles['BodyText'],
-        fontSize=11,
-        spaceBefore=6,
-        spaceAfter=6
-    )
-
-    # Prepare the elements that will go into the PDF
-    elements = []
-
-    # Add title and subtitle
-    title_text = f"STUDY GUIDE: {title.upper()}"
-    elements.append(Paragraph(title_text, custom_title_style))
-
-    date_text = f"Education Level: {education_level} | Generated on: {datetime.now().strftime('%Y-%m-%d')}"
-    elements.append(Paragraph(date_text, custom_subtitle_style))
-    elements.append(Spacer(1, 0.2 * inch))
-
-    # Process the text content by sections
-    sections = text_content.split('=====')
-
-    for section in sections:
-        if not section.strip():
-            continue
-
-        # Try to split into section title and content
-        parts = section.strip().split('\n', 1)
-
-        if len(parts) > 1:
-            section_title, section_content = parts
-            elements.append(Paragraph(section_title.strip(), custom_heading_style))
-
-            # Process each line of content
-            for line in section_content.strip().split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-
-                # Format bullet points and numbered lists
-                if line.startswith('- '):
-                    line = '• ' + line[2:]
-                    line = '&nbsp;&nbsp;&nbsp;&nbsp;' + line
-                elif line.startswith('   - '):
-                    line = '&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;◦ ' + line[5:]
-
-                elements.append(Paragraph(line, custom_body_style))
-        else:
-            # If only one part, treat it as regular content
-            for line in section.strip().split('\n'):
-                if line.strip():
-                    elements.append(Paragraph(line.strip(), custom_body_style))
 
-    # Add footer note
-    elements.append(Spacer(1, 0.5 * inch))
-    footer_text = "This study guide was automatically generated by TutorAI to help with your studies."
-    elements.append(Paragraph(footer_text, custom_subtitle_style))
+    try:
+        response = send_from_directory(GUIDES_DIR, filename, as_attachment=True,
+                                       max_age=DOWNLOAD_MAX_AGE)
+    except NotFound:
+        return "File not found", 404
 
-    # Build the PDF
-    doc.build(elements)
+    # Download names are never reused for different content
+    response.cache_control.immutable = True
+    return response
 
-    return output_path
 
 def mock_deekseek_api(data):
     """Mock function to generate a study guide based on user input."""
@@ -6,11 +6,28 @@ import shutil
 # Add the parent directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+@pytest.fixture(scope="session")
+def canned_pdf():
+    """Render a single small PDF to reuse for the whole session."""
+    from pdf_renderer import render_pdf
+    return render_pdf("===== TEST STUDY GUIDE =====\nCanned content", "Test Title", "Test Level")
+
+@pytest.fixture
+def fast_pdf(canned_pdf, monkeypatch):
+    """Serve the canned PDF from endpoints instead of rendering with ReportLab."""
+    import study_guide
+    monkeypatch.setattr(study_guide, "render_pdf_in_pool", lambda *args, **kwargs: canned_pdf)
+    return canned_pdf
+
 @pytest.fixture(scope="session", autouse=True)
-def setup_test_environment():
+def setup_test_environment(tmp_path_factory):
     """Setup the test environment before all tests."""
-    # Create necessary directories
-    os.makedirs("static/guides", exist_ok=True)
+    import study_guide
+
+    # Keep generated PDFs out of the working tree's static/guides
+    guides_dir = tmp_path_factory.mktemp("guides")
+    original_guides_dir = study_guide.GUIDES_DIR
+    study_guide.GUIDES_DIR = str(guides_dir)
     
     # Set environment variables for testing
     os.environ["USE_MOCK_API"] = "True"  # Use mock API by default in tests
@@ -19,9 +36,5 @@ def setup_test_environment():
     yield
     
     # Clean up test files after all tests
-    for file in os.listdir("static/guides"):
-        if file.startswith("study_guide_"):
-            try:
-                os.remove(os.path.join("static/guides", file))
-            except:
-                pass  # Ignore errors during cleanup
\ No newline at end of file
+    study_guide.GUIDES_DIR = original_guides_dir
+    shutil.rmtree(guides_dir, ignore_errors=True)
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from ai_helper import generate_study_guide, get_openai_client
+from ai_helper import generate_study_guide, get_openai_client, stream_study_guide
 
 @patch('ai_helper.get_openai_client')
 def test_generate_study_guide_success(mock_get_client):
@@ -98,4 +98,50 @@ def test_generate_study_guide_failure(mock_get_client):
     assert content is None
     assert error is not None
     assert "Error generating study guide" in error
-    assert "API connection error" in error
\ No newline at end of file
+    assert "API connection error" in error
+
+def _stream_chunks(*texts):
+    """Build fake streaming chunks carrying the given text deltas."""
+    chunks = []
+    for text in texts:
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = text
+        chunks.append(chunk)
+    return chunks
+
+@patch('ai_helper.get_openai_client')
+def test_stream_study_guide(mock_get_client):
+    """Test streaming study guide generation via the DeepSeek API."""
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.return_value = _stream_chunks("===", "== TEST ", None, "CONTENT =====\nBody")
+    mock_get_client.return_value = mock_client
+
+    content = "".join(stream_study_guide({'class': 'Mathematics', 'unit': 'Calculus'}))
+
+    assert content == "===== TEST CONTENT =====\nBody"
+    args, kwargs = mock_client.chat.completions.create.call_args
+    assert kwargs['stream'] is True
+
+@patch('ai_helper.get_openai_client')
+def test_stream_study_guide_without_section_headers(mock_get_client):
+    """Test that streamed study guides without section headers get one prepended."""
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.return_value = _stream_chunks("No ", "headers here.")
+    mock_get_client.return_value = mock_client
+
+    content = "".join(stream_study_guide({'class': 'Literature', 'unit': 'Shakespeare'}))
+
+    assert content.startswith("===== STUDY GUIDE FOR LITERATURE - SHAKESPEARE =====")
+    assert content.endswith("No headers here.")
+
+@patch('ai_helper.OpenAI')
+def test_get_openai_client_is_reused(mock_openai):
+    """Test that the OpenAI client is created once and shared across calls."""
+    get_openai_client.cache_clear()
+    try:
+        assert get_openai_client() is get_openai_client()
+        mock_openai.assert_called_once()
+        args, kwargs = mock_openai.call_args
+        assert kwargs['http_client'] is not None
+    finally:
+        get_openai_client.cache_clear()
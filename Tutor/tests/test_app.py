@@ -0,0 +1,26 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from app import app, OrJSONProvider
+
+def test_json_provider_round_trip():
+    """Test that the app parses and serializes JSON with orjson."""
+    assert isinstance(app.json, OrJSONProvider)
+
+    with app.test_request_context(json={'class': 'Biology', 'unit': 'Cells'}):
+        from flask import request, jsonify
+        assert request.json == {'class': 'Biology', 'unit': 'Cells'}
+        response = jsonify({"success": True, "filename": "study_guide.pdf"})
+
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {"success": True, "filename": "study_guide.pdf"}
+
+def test_json_provider_matches_flask_defaults():
+    """Test that types Flask serializes specially keep their Flask format."""
+    result = app.json.loads(app.json.dumps({'b': Decimal('1.50'), 'a': date(2025, 1, 2)}))
+
+    assert result == {'a': 'Thu, 02 Jan 2025 00:00:00 GMT', 'b': '1.50'}
+    assert app.json.dumps({'b': 1, 'a': 2}) == '{"a":2,"b":1}'
+    assert app.json.dumps({'b': 1, 'a': 2}, sort_keys=False) == '{"b":1,"a":2}'
+    assert app.json.dumps([1], separators=(', ', ': ')) == '[1]'
+    assert app.json.dumps(2 ** 70) == str(2 ** 70)
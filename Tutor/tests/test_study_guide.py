@@ -1,23 +1,28 @@
 import pytest
 import os
+import gzip
 import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from unittest.mock import patch, MagicMock
+from werkzeug.http import http_date
 from app import app
-from study_guide import generate_pdf, mock_deekseek_api
+import study_guide
+from study_guide import mock_deekseek_api, render_pdf_in_pool
+from pdf_renderer import generate_pdf, render_pdf, format_section_content, iter_sections
 
 @pytest.fixture
-def client():
+def client(fast_pdf):
     """Create a test client for the app."""
     app.config['TESTING'] = True
-    # Create test directories
-    os.makedirs("static/guides", exist_ok=True)
     with app.test_client() as client:
         yield client
     
     # Clean up test files
-    for file in os.listdir("static/guides"):
+    for file in os.listdir(study_guide.GUIDES_DIR):
         if file.startswith("study_guide_test_"):
-            os.remove(os.path.join("static/guides", file))
+            os.remove(os.path.join(study_guide.GUIDES_DIR, file))
 
 def test_mock_deekseek_api():
     """Test the mock API function."""
@@ -43,13 +48,123 @@ This is test content.
 - Bullet point 2
    - Sub bullet point
 """
-    output_path = "static/guides/study_guide_test_pdf.pdf"
+    output_path = os.path.join(study_guide.GUIDES_DIR, "study_guide_test_pdf.pdf")
     
     generate_pdf(test_content, output_path, "Test Title", "Test Level")
     
     assert os.path.exists(output_path)
     assert os.path.getsize(output_path) > 0
 
+def test_render_pdf():
+    """Test rendering a PDF to bytes without touching disk."""
+    pdf_bytes = render_pdf("===== TEST SECTION =====\nThis is test content.", "Test Title", "Test Level")
+
+    assert pdf_bytes.startswith(b'%PDF')
+
+def test_render_pdf_in_pool_recovers_from_dead_worker():
+    """Test that a killed render worker does not break later renders."""
+    assert render_pdf_in_pool("===== TEST =====\nBefore", "Test Title", "Test Level").startswith(b'%PDF')
+
+    pool = study_guide._pdf_pool
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+
+    assert render_pdf_in_pool("===== TEST =====\nAfter", "Test Title", "Test Level").startswith(b'%PDF')
+    assert study_guide._pdf_pool is not pool
+
+def test_render_pdf_in_pool_timeout(monkeypatch):
+    """Test that a render exceeding the timeout fails and its pool is replaced."""
+    pool = study_guide._get_pdf_pool()
+    monkeypatch.setattr(study_guide, "PDF_RENDER_TIMEOUT", 0)
+
+    with pytest.raises(FutureTimeoutError):
+        render_pdf_in_pool("===== TEST =====\nSlow", "Test Title", "Test Level")
+    assert study_guide._pdf_pool is not pool
+
+    monkeypatch.setattr(study_guide, "PDF_RENDER_TIMEOUT", 60)
+    assert render_pdf_in_pool("===== TEST =====\nFast", "Test Title", "Test Level").startswith(b'%PDF')
+
+def test_render_pdf_in_pool_timeout_retries_queued_renders(monkeypatch):
+    """Test that renders queued behind a timed-out one are retried, not failed."""
+    study_guide._discard_pdf_pool(study_guide._get_pdf_pool())
+    monkeypatch.setattr(study_guide, "PDF_WORKERS", 1)
+    monkeypatch.setattr(study_guide, "PDF_RENDER_TIMEOUT", 2)
+    slow_guide = "===== SLOW =====\n" + "- line of text\n" * 20000
+
+    def render(text):
+        try:
+            return render_pdf_in_pool(text, "Test Title", "Test Level")
+        except Exception as error:
+            return error
+
+    with ThreadPoolExecutor(max_workers=4) as threads:
+        slow = threads.submit(render, slow_guide)
+        # Let the slow render take the only worker so the others queue behind it
+        time.sleep(0.2)
+        fast = [threads.submit(render, "===== FAST =====\nQuick") for _ in range(3)]
+
+        assert isinstance(slow.result(), FutureTimeoutError)
+        for future in fast:
+            assert future.result().startswith(b'%PDF')
+
+def test_iter_sections():
+    """Test splitting study guide text into titled sections."""
+    text = """Preamble line
+===== INTRODUCTION =====
+Intro text.
+===== KEY CONCEPTS =====
+- Concept
+"""
+
+    sections = [(title, content.strip()) for title, content in iter_sections(text)]
+
+    assert sections == [
+        (None, "Preamble line"),
+        ("INTRODUCTION", "Intro text."),
+        ("KEY CONCEPTS", "- Concept"),
+    ]
+
+@patch('ai_helper.get_openai_client')
+def test_format_section_content_of_headerless_reply(mock_get_client):
+    """Test that the header added to a headerless reply keeps its bullet levels."""
+    from ai_helper import generate_study_guide
+
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "Intro line\n- Point one\n   - Sub point\n- Point two"
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_get_client.return_value = mock_client
+
+    content, error = generate_study_guide({'class': 'Biology', 'unit': 'Cells'})
+    (title, section_content), = iter_sections(content)
+
+    assert title == "STUDY GUIDE FOR BIOLOGY - CELLS"
+    assert format_section_content(section_content) == [
+        "Intro line",
+        "&nbsp;&nbsp;&nbsp;&nbsp;• Point one",
+        "&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;◦ Sub point",
+        "&nbsp;&nbsp;&nbsp;&nbsp;• Point two",
+    ]
+
+def test_format_section_content():
+    """Test bullet and sub-bullet formatting of section content."""
+    section_content = """
+        1. Main Concept
+        - Detail point
+
+           - Sub point
+    """
+
+    lines = format_section_content(section_content)
+
+    assert lines == [
+        "1. Main Concept",
+        "&nbsp;&nbsp;&nbsp;&nbsp;• Detail point",
+        "&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;◦ Sub point",
+    ]
+
 @patch('study_guide.generate_study_guide')
 def test_generate_study_guide_endpoint_success(mock_generate, client):
     """Test the study guide generation endpoint with successful generation."""
@@ -75,10 +190,74 @@ def test_generate_study_guide_endpoint_success(mock_generate, client):
     assert data['success'] == True
     assert 'filename' in data
     assert data['filename'].endswith('.pdf')
-    assert 'content' in data
+    assert 'content' not in data
+
+    # The guide text is only included when asked for
+    response = client.post('/generate-study-guide?include_content=true',
+                          data=json.dumps(test_data),
+                          content_type='application/json')
+    data = json.loads(response.data)
     # Just check for any content, as the format might vary
     assert len(data['content']) > 0
 
+def test_generated_pdf_is_downloadable_from_any_worker(client):
+    """Test that a generated PDF is stored on disk for other workers to serve."""
+    test_data = {
+        'class': 'Physics',
+        'unit': 'Mechanics',
+        'year': 'College',
+        'details': 'Newton\'s laws'
+    }
+
+    response = client.post('/generate-study-guide',
+                          data=json.dumps(test_data),
+                          content_type='application/json')
+    filename = json.loads(response.data)['filename']
+    assert os.path.exists(os.path.join(study_guide.GUIDES_DIR, filename))
+
+    response = client.get(f'/download/{filename}')
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/pdf"
+    assert response.headers["Content-Disposition"].startswith("attachment")
+    assert response.data.startswith(b'%PDF')
+
+    # Validators come from the stored file, so every worker sends the same ones
+    assert 'immutable' in response.headers["Cache-Control"]
+    pdf_path = os.path.join(study_guide.GUIDES_DIR, filename)
+    last_modified = response.headers["Last-Modified"]
+    assert last_modified == http_date(int(os.path.getmtime(pdf_path)))
+    etag = response.headers["ETag"]
+    assert client.get(f'/download/{filename}').headers["ETag"] == etag
+
+    # Repeat downloads are revalidated by either validator
+    response = client.get(f'/download/{filename}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    response = client.get(f'/download/{filename}',
+                          headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+def test_generate_study_guide_endpoint_renders_in_worker_pool():
+    """Test the endpoint end to end through the real PDF worker pool."""
+    app.config['TESTING'] = True
+    test_data = {
+        'class': 'Zoology',
+        'unit': 'Mammals',
+        'year': 'College',
+        'details': 'Marine mammals'
+    }
+
+    with app.test_client() as pool_client:
+        response = pool_client.post('/generate-study-guide',
+                                   data=json.dumps(test_data),
+                                   content_type='application/json')
+        assert response.status_code == 200
+        filename = json.loads(response.data)['filename']
+
+        response = pool_client.get(f'/download/{filename}')
+        assert response.status_code == 200
+        assert response.data.startswith(b'%PDF')
+        assert len(response.data) > 1000
+
 @patch('study_guide.generate_study_guide')
 def test_generate_study_guide_endpoint_failure(mock_generate, client):
     """Test the study guide generation endpoint with an error."""
@@ -114,10 +293,112 @@ def test_generate_study_guide_endpoint_failure(mock_generate, client):
         # Restore the original environment variable
         os.environ['USE_MOCK_API'] = original_use_mock
 
+@patch('study_guide.mock_deekseek_api')
+def test_generate_study_guide_endpoint_rejects_invalid_payload(mock_api, client):
+    """Test that malformed payloads are rejected before generating anything."""
+    invalid_payloads = [
+        ['not', 'an', 'object'],
+        {'class': 'Physics', 'unit': 42},
+        {'class': 'Physics', 'details': 'x' * 5000},
+    ]
+
+    for payload in invalid_payloads:
+        response = client.post('/generate-study-guide',
+                              data=json.dumps(payload),
+                              content_type='application/json')
+        assert response.status_code == 400
+        data = json.loads(response.data)
+        assert data['success'] == False
+        assert 'error' in data
+
+    response = client.post('/generate-study-guide', data='not json', content_type='text/plain')
+    assert response.status_code == 400
+    mock_api.assert_not_called()
+
+def test_generate_study_guide_endpoint_compressed(client):
+    """Test that the JSON response is compressed when the client accepts it."""
+    test_data = {
+        'class': 'Geology',
+        'unit': 'Plate Tectonics',
+        'year': 'College',
+        'details': 'Fault lines'
+    }
+
+    response = client.post('/generate-study-guide?include_content=true',
+                          data=json.dumps(test_data),
+                          content_type='application/json',
+                          headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    data = json.loads(gzip.decompress(response.data))
+    assert data['success'] == True
+
+def test_stream_study_guide_endpoint(client):
+    """Test the streaming study guide endpoint with the mock API."""
+    test_data = {
+        'class': 'Physics',
+        'unit': 'Mechanics',
+        'year': 'College',
+        'details': 'Newton\'s laws'
+    }
+
+    response = client.post('/stream-study-guide',
+                          data=json.dumps(test_data),
+                          content_type='application/json')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    body = response.get_data(as_text=True)
+    events = body.split('\n\n')
+    assert 'STUDY GUIDE FOR PHYSICS - MECHANICS' in json.loads(events[0][len('data: '):])
+
+    done_event = events[-2]
+    assert done_event.startswith('event: done\ndata: ')
+    filename = json.loads(done_event.split('data: ', 1)[1])['filename']
+    response = client.get(f'/download/{filename}')
+    assert response.status_code == 200
+    assert response.data.startswith(b'%PDF')
+
+@patch('study_guide.generate_study_guide')
+def test_generate_study_guide_endpoint_reuses_identical_requests(mock_generate, client):
+    """Test that an identical request is served without calling the API again."""
+    original_use_mock = os.environ.get('USE_MOCK_API', 'True')
+    os.environ['USE_MOCK_API'] = 'False'
+
+    try:
+        mock_generate.return_value = ("===== CACHED GUIDE =====\nTest content", None)
+
+        test_data = {
+            'class': 'Astronomy',
+            'unit': 'Stars',
+            'year': 'College',
+            'details': 'Stellar lifecycle'
+        }
+
+        filenames = set()
+        for _ in range(2):
+            response = client.post('/generate-study-guide?include_content=true',
+                                data=json.dumps(test_data),
+                                content_type='application/json')
+            assert response.status_code == 200
+            data = json.loads(response.data)
+            assert data['success'] == True
+            assert 'CACHED GUIDE' in data['content']
+            filenames.add(data['filename'])
+
+        mock_generate.assert_called_once()
+        assert len(filenames) == 1
+        response = client.get(f"/download/{data['filename']}")
+        assert response.status_code == 200
+        assert response.data.startswith(b'%PDF')
+    finally:
+        os.environ['USE_MOCK_API'] = original_use_mock
+
 def test_download_endpoint(client):
     """Test the download endpoint."""
     # Create a test file
-    test_file_path = "static/guides/study_guide_test_download.txt"
+    test_file_path = os.path.join(study_guide.GUIDES_DIR, "study_guide_test_download.txt")
     with open(test_file_path, "w") as f:
         f.write("Test content for download")
     
@@ -127,6 +408,8 @@ def test_download_endpoint(client):
     # Check that the Content-Type starts with text/plain, ignoring charset details
     assert response.headers["Content-Type"].startswith("text/plain")
     assert response.headers["Content-Disposition"].startswith("attachment")
+    assert "Last-Modified" in response.headers
+    assert "max-age=31536000" in response.headers["Cache-Control"]
     
     # Test file not found
     response = client.get('/download/non_existent_file.txt')